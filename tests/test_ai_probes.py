@@ -0,0 +1,119 @@
+# tests/test_ai_probes.py
+
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+
+from unified_stack_manager.core import ai_probes
+
+class TestRunProbes(unittest.TestCase):
+
+    def setUp(self):
+        ai_probes._recent_probes.clear()
+
+    @patch.object(ai_probes, 'aiohttp', None)
+    @patch('urllib.request.urlopen')
+    def test_urllib_fallback_keeps_probe_order(self, mock_urlopen):
+        """Test that the thread-pool fallback reports every probe in input order."""
+        def fake_urlopen(request, timeout):
+            if 'down' in request.full_url:
+                raise OSError('connection refused')
+            response = MagicMock(status=200)
+            response.__enter__.return_value = response
+            return response
+        mock_urlopen.side_effect = fake_urlopen
+
+        results = ai_probes.run_probes([
+            ('Ollama', 'http://down.local/', None, 1.5, 'HEAD'),
+            ('OpenAI API', 'https://api.example.com/v1/models', {'Authorization': 'Bearer x'}, 10, 'GET'),
+        ])
+
+        self.assertEqual(results, [
+            ('Ollama', False, 'connection refused'),
+            ('OpenAI API', True, ''),
+        ])
+
+    def test_provider_probes_skip_placeholder_keys(self):
+        """Test that only Ollama and providers with real keys are probed."""
+        probes = ai_probes.provider_probes({
+            'OPENAI_API_KEY': 'your_openai_key_here',
+            'ANTHROPIC_API_KEY': 'sk-ant-test',
+            'OLLAMA_BASE_URL': 'http://127.0.0.1:11434',
+        })
+
+        self.assertEqual([probe[0] for probe in probes], ['Ollama', 'Anthropic API'])
+        self.assertEqual(probes[0][1], 'http://127.0.0.1:11434/')
+        self.assertEqual(probes[0][4], 'HEAD')
+        self.assertEqual(probes[1][2]['x-api-key'], 'sk-ant-test')
+
+    def test_deep_check_lists_ollama_models(self):
+        """Test that the deep check falls back to GET /api/tags for Ollama."""
+        probes = ai_probes.provider_probes({'OLLAMA_BASE_URL': 'http://127.0.0.1:11434/'}, deep=True)
+
+        self.assertEqual(probes, [('Ollama', 'http://127.0.0.1:11434/api/tags', None, 5, 'GET')])
+
+    @patch.object(ai_probes, 'aiohttp', None)
+    @patch('urllib.request.urlopen')
+    def test_head_probe_accepts_not_found(self, mock_urlopen):
+        """Test that a 404 on the Ollama root still counts as the daemon being up."""
+        mock_urlopen.side_effect = ai_probes.urllib.error.HTTPError('http://x/', 404, 'Not Found', {}, None)
+
+        results = ai_probes.run_probes([
+            ('Ollama', 'http://x/', None, 1.5, 'HEAD'),
+            ('OpenAI API', 'https://x/v1/models', None, 10, 'GET'),
+        ])
+
+        self.assertEqual(results, [('Ollama', True, ''), ('OpenAI API', False, 'HTTP 404')])
+
+    @patch.object(ai_probes, 'aiohttp', None)
+    @patch('urllib.request.urlopen')
+    def test_repeated_probe_reuses_recent_result(self, mock_urlopen):
+        """Test that the same probe from another site reuses the recent result instead of hitting the network."""
+        response = MagicMock(status=200)
+        response.__enter__.return_value = response
+        mock_urlopen.return_value = response
+        probe = ('OpenAI API', 'https://api.example.com/v1/models', {'Authorization': 'Bearer x'}, 10, 'GET')
+
+        first = ai_probes.run_probes([probe])
+        second = ai_probes.run_probes([probe, ('Ollama', 'http://127.0.0.1:11434/', None, 1.5, 'HEAD')])
+
+        self.assertEqual(first, [('OpenAI API', True, '')])
+        self.assertEqual(second, [('OpenAI API', True, ''), ('Ollama', True, '')])
+        self.assertEqual(mock_urlopen.call_count, 2)
+
+    @patch.object(ai_probes, 'aiohttp', None)
+    @patch('urllib.request.urlopen')
+    def test_failed_probe_is_retried_and_expired_entries_dropped(self, mock_urlopen):
+        """Test that failures are not cached and expired results are evicted on the next run."""
+        mock_urlopen.side_effect = OSError('connection refused')
+        probe = ('Ollama', 'http://127.0.0.1:11434/', None, 1.5, 'HEAD')
+
+        self.assertEqual(ai_probes.run_probes([probe]), [('Ollama', False, 'connection refused')])
+        self.assertEqual(ai_probes.run_probes([probe]), [('Ollama', False, 'connection refused')])
+        self.assertEqual(mock_urlopen.call_count, 2)
+        self.assertEqual(ai_probes._recent_probes, {})
+
+        ai_probes._recent_probes[('stale',)] = (-ai_probes.PROBE_CACHE_TTL - 1, MagicMock())
+        mock_urlopen.side_effect = None
+        response = MagicMock(status=200)
+        response.__enter__.return_value = response
+        mock_urlopen.return_value = response
+        ai_probes.run_probes([probe])
+        self.assertEqual(list(ai_probes._recent_probes), [ai_probes._probe_key(probe)])
+
+    def test_run_async_uses_uvloop_when_available(self):
+        """Test that coroutines run on the uvloop loop when the package is installed."""
+        async def answer():
+            return 42
+
+        fake_uvloop = MagicMock(new_event_loop=MagicMock(side_effect=asyncio.new_event_loop))
+        with patch.object(ai_probes, 'uvloop', fake_uvloop):
+            self.assertEqual(ai_probes._run_async(answer()), 42)
+        fake_uvloop.new_event_loop.assert_called_once()
+
+    def test_no_probes(self):
+        """Test that an empty probe list does not start any client."""
+        self.assertEqual(ai_probes.run_probes([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
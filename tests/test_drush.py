@@ -0,0 +1,123 @@
+# tests/test_drush.py
+
+import json
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+from unified_stack_manager.core.drush import (
+    REQUIRED_MODULES, TEST_AGENT_VALIDATE_SCRIPT, DrushError, DrushWorker, agent_test_report, module_report, run_test_agent
+)
+
+# Sustituto de drush: responde a cada fragmento con su propio texto y el PID,
+# siguiendo el mismo protocolo de líneas JSON que el script PHP del worker.
+FAKE_DRUSH = textwrap.dedent('''
+    import json, os, sys
+    for line in sys.stdin:
+        code = json.loads(line)
+        if code == "exit":
+            sys.exit(1)
+        if code == "notice":
+            print("PHP Deprecated: algo obsoleto", flush=True)
+            continue
+        print(json.dumps({"ok": True, "output": f"{os.getpid()}:{code}"}), flush=True)
+''')
+
+class TestDrushWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.site_path = Path(self.tmp.name)
+        drush = self.site_path / 'vendor' / 'bin' / 'drush'
+        drush.parent.mkdir(parents=True)
+        drush.write_text(FAKE_DRUSH)
+        (self.site_path / 'web').mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reuses_one_process(self):
+        """Test that several snippets are served by the same worker process."""
+        with DrushWorker(sys.executable, self.site_path) as worker:
+            pids = {worker.run(code)[1].split(':')[0] for code in ('a', 'b', 'c')}
+        self.assertEqual(len(pids), 1)
+
+    def test_restarts_after_max_calls(self):
+        """Test that the worker is recycled once max_calls is reached."""
+        with DrushWorker(sys.executable, self.site_path, max_calls=2) as worker:
+            pids = [worker.run(code)[1].split(':')[0] for code in ('a', 'b', 'c')]
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def test_dead_worker_raises(self):
+        """Test that an unexpected worker exit surfaces as DrushError."""
+        with DrushWorker(sys.executable, self.site_path) as worker:
+            with self.assertRaises(DrushError):
+                worker.run('exit')
+
+    def test_non_json_output_raises(self):
+        """Test that a stray PHP notice on stdout surfaces as DrushError and the next call gets a fresh worker."""
+        with DrushWorker(sys.executable, self.site_path) as worker:
+            with self.assertRaises(DrushError) as ctx:
+                worker.run('notice')
+            self.assertIn('PHP Deprecated', str(ctx.exception))
+            self.assertTrue(worker.run('a')[0])
+
+    @patch('unified_stack_manager.core.drush.subprocess.run')
+    def test_test_agent_falls_back_to_drush_command(self, mock_run):
+        """Test that the agent runs through ai-agents:execute when PHP cannot execute it directly."""
+        mock_run.return_value = MagicMock(returncode=0)
+
+        output = run_test_agent(sys.executable, self.site_path)
+
+        self.assertEqual(output.split(':', 1)[1], TEST_AGENT_VALIDATE_SCRIPT)
+        self.assertEqual(mock_run.call_args[0][0][2:], ['ai-agents:execute', 'test_agent_verify'])
+
+    @patch('unified_stack_manager.core.drush.subprocess.run')
+    def test_test_agent_failure_raises(self, mock_run):
+        """Test that a failed agent execution is reported as DrushError."""
+        mock_run.return_value = MagicMock(returncode=1, stderr=b'boom')
+
+        with self.assertRaisesRegex(DrushError, 'boom'):
+            run_test_agent(sys.executable, self.site_path)
+
+class TestModuleReport(unittest.TestCase):
+
+    def test_lists_only_missing_modules(self):
+        """Test that the report is a count line followed by the missing modules only."""
+        total = len(REQUIRED_MODULES)
+        lines = module_report(frozenset({'mcp', 'ai', 'unrelated'})).splitlines()
+
+        self.assertEqual(lines[0], f"  ⚠️ Habilitados 2 de {total} módulos requeridos; faltan {total - 2}:")
+        self.assertEqual(lines[1], "  ❌ Módulo 'key'")
+        self.assertEqual(len(lines), 1 + total - 2)
+        self.assertNotIn("  ❌ Módulo 'ai'", lines)
+
+    def test_all_modules_enabled(self):
+        """Test that a complete site gets a single summary line."""
+        self.assertEqual(module_report(frozenset(REQUIRED_MODULES)),
+                         f"  ✅ Los {len(REQUIRED_MODULES)} módulos requeridos están habilitados.")
+
+class TestAgentTestReport(unittest.TestCase):
+
+    def test_markdown_report(self):
+        """Test that the Markdown report is one newline-terminated text with the errors inside the code block."""
+        report = agent_test_report('example.com', 'markdown', False, 'salida', 'fallo')
+
+        self.assertTrue(report.startswith("# Informe de Pruebas de Agentes de IA - example.com\n"))
+        self.assertIn("❌ Se detectaron errores en las pruebas.", report)
+        self.assertTrue(report.endswith("```\nsalida\n\n### Errores:\nfallo\n```\n"))
+
+    def test_json_report(self):
+        """Test that the JSON report is a single document followed by a newline."""
+        report = agent_test_report('example.com', 'json', True, 'salida', '')
+
+        self.assertTrue(report.endswith("}\n"))
+        data = json.loads(report)
+        self.assertEqual((data['site'], data['success'], data['output']), ('example.com', True, 'salida'))
+
+if __name__ == '__main__':
+    unittest.main()
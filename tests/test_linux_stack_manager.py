@@ -0,0 +1,275 @@
+# tests/test_linux_stack_manager.py
+
+import io
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+from unified_stack_manager.core import drush, site_state
+from unified_stack_manager.core.base_stack_manager import _ThreadStdout
+from unified_stack_manager.linux import stack_manager
+from unified_stack_manager.linux.stack_manager import LinuxStackManager
+
+class TestLinuxStackManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        settings = {
+            'apache.sites_dir': str(self.root / 'sites'),
+            'apache.vhosts_dir': str(self.root / 'vhosts'),
+        }
+        config = MagicMock()
+        config.get.side_effect = lambda key, default=None: settings.get(key, default)
+        with patch('unified_stack_manager.linux.stack_manager.get_package_manager'), \
+             patch('unified_stack_manager.linux.stack_manager.ApacheManager'), \
+             patch('unified_stack_manager.linux.stack_manager.MySQLManager'), \
+             patch('unified_stack_manager.linux.stack_manager.PHPManager'):
+            self.manager = LinuxStackManager(config, MagicMock())
+        cache_patch = patch('unified_stack_manager.core.drush.PM_LIST_CACHE_DIR', self.root / 'cache')
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        self.core_extension = 'hash-1'
+        hash_patch = patch('unified_stack_manager.core.drush._core_extension_hash',
+                           side_effect=lambda php_cmd, site_path: self.core_extension)
+        self.mock_hash = hash_patch.start()
+        self.addCleanup(hash_patch.stop)
+        drush._modules_memo.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch('builtins.print')
+    def test_validate_env_file_parses_assignments(self, mock_print):
+        """Test that the .env parser handles quotes, comments and spacing."""
+        (self.root / '.env').write_text(
+            '# comentario\n'
+            'OPENAI_API_KEY="sk-test"\n'
+            "ANTHROPIC_API_KEY = 'your_key_here'\n"
+            '#GOOGLE_GEMINI_API_KEY=abc\n'
+            'OLLAMA_BASE_URL=http://localhost:11434\n'
+        )
+        env_vars = self.manager._validate_env_file(self.root)
+
+        self.assertEqual(env_vars, {
+            'OPENAI_API_KEY': 'sk-test',
+            'ANTHROPIC_API_KEY': 'your_key_here',
+            'OLLAMA_BASE_URL': 'http://localhost:11434',
+        })
+
+    @patch('builtins.print')
+    def test_validate_env_file_reuses_parse_until_modified(self, mock_print):
+        """Test that an unchanged .env is parsed once and a modified one is parsed again."""
+        env_file = self.root / '.env'
+        env_file.write_text('OPENAI_API_KEY=sk-one\n')
+        with patch('unified_stack_manager.linux.stack_manager._parse_env',
+                   side_effect=stack_manager._parse_env) as mock_parse:
+            self.manager._validate_env_file(self.root)
+            self.manager._validate_env_file(self.root)
+            self.assertEqual(mock_parse.call_count, 1)
+
+            env_file.write_text('OPENAI_API_KEY=sk-second\n')
+            env_vars = self.manager._validate_env_file(self.root)
+
+        self.assertEqual(mock_parse.call_count, 2)
+        self.assertEqual(env_vars, {'OPENAI_API_KEY': 'sk-second'})
+
+    @patch('builtins.print')
+    def test_validate_env_file_missing(self, mock_print):
+        """Test that a missing .env is reported, pointing at .env.example when present."""
+        (self.root / '.env.example').write_text('OPENAI_API_KEY=your_key_here\n')
+
+        self.assertIsNone(self.manager._validate_env_file(self.root))
+        mock_print.assert_called_with("⚠️ .env no encontrado, pero .env.example existe.")
+
+    @patch('builtins.print')
+    def test_switch_php_version_rewrites_socket(self, mock_print):
+        """Test that only the PHP-FPM socket version is rewritten in the vhost."""
+        vhosts_dir = self.root / 'vhosts'
+        vhosts_dir.mkdir()
+        vhost_file = vhosts_dir / 'example.com.conf'
+        vhost_file.write_text(
+            '<VirtualHost *:80>\n'
+            '    <FilesMatch \\.php$>\n'
+            '        SetHandler "proxy:unix:/var/run/php/php8.1-fpm.sock|fcgi://localhost/"\n'
+            '    </FilesMatch>\n'
+            '</VirtualHost>\n'
+        )
+        self.manager.apache.reload_service.return_value = True
+
+        self.assertTrue(self.manager.switch_php_version('example.com', '8.3'))
+        self.assertIn('/var/run/php/php8.3-fpm.sock|', vhost_file.read_text())
+        self.assertNotIn('php8.1', vhost_file.read_text())
+
+    @patch('builtins.print')
+    def test_switch_php_version_preserves_raw_bytes(self, mock_print):
+        """Test that the vhost is rewritten as bytes, keeping non-UTF-8 content intact."""
+        vhosts_dir = self.root / 'vhosts'
+        vhosts_dir.mkdir()
+        vhost_file = vhosts_dir / 'example.com.conf'
+        handler = b'SetHandler "proxy:unix:/var/run/php/php8.1-fpm.sock|fcgi://localhost/"\n'
+        vhost_file.write_bytes(b'# Configuraci\xf3n latin-1\n' + handler + b'<VirtualHost *:443>\n' + handler)
+        self.manager.apache.reload_service.return_value = True
+
+        self.assertTrue(self.manager.switch_php_version('example.com', '8.2'))
+        data = vhost_file.read_bytes()
+        self.assertTrue(data.startswith(b'# Configuraci\xf3n latin-1\n'))
+        self.assertEqual(data.count(b'php8.2-fpm.sock'), 2)
+
+    @patch('builtins.print')
+    def test_list_sites_names_only(self, mock_print):
+        """Test that names_only returns bare names without printing."""
+        vhosts_dir = self.root / 'vhosts'
+        vhosts_dir.mkdir()
+        for name in ('a.com.conf', 'b.org.conf', 'README'):
+            (vhosts_dir / name).write_text('')
+
+        self.assertEqual(sorted(self.manager.list_sites(names_only=True)), ['a.com', 'b.org'])
+        mock_print.assert_not_called()
+
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_verify_drupal_modules_reads_drush_names(self, mock_run, mock_print):
+        """Test that the module names listed by Drush are read as the enabled modules."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=b'ai\nkey\nnode\n')
+
+        self.manager._verify_drupal_modules(self.root)
+
+        lines = "\n".join(call.args[0] for call in mock_print.call_args_list).splitlines()
+        self.assertIn("  ❌ Módulo 'mcp'", lines)
+        self.assertNotIn("  ❌ Módulo 'ai'", lines)
+        self.assertNotIn("  ❌ Módulo 'key'", lines)
+        self.assertIn('--field=name', mock_run.call_args[0][0])
+
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_verify_drupal_modules_reuses_cached_pm_list(self, mock_run, mock_print):
+        """Test that a second verification reads the cached pm:list instead of spawning Drush."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=b'ai\n')
+
+        self.manager._verify_drupal_modules(self.root)
+        self.manager._verify_drupal_modules(self.root)
+
+        self.assertEqual(mock_run.call_count, 1)
+        lines = "\n".join(call.args[0] for call in mock_print.call_args_list).splitlines()
+        self.assertEqual(lines.count("  ❌ Módulo 'key'"), 2)
+
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_enabled_modules_survive_a_new_process(self, mock_run, mock_print):
+        """Test that the on-disk pm:list cache still serves a process whose in-memory copy is empty."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=b'ai\n')
+
+        self.assertEqual(drush.enabled_modules('php', self.root), frozenset({'ai'}))
+        drush._modules_memo.clear()
+        self.assertEqual(drush.enabled_modules('php', self.root), frozenset({'ai'}))
+
+        self.assertEqual(mock_run.call_count, 1)
+        drush.invalidate_enabled_modules(self.root)
+        drush.enabled_modules('php', self.root)
+        self.assertEqual(mock_run.call_count, 2)
+
+    @patch('subprocess.run')
+    def test_enabled_modules_follow_core_extension(self, mock_run):
+        """Test that modules enabled outside USM or a deep check bypass the cached pm:list."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=b'ai\n')
+        drush.enabled_modules('php', self.root)
+
+        self.core_extension = 'hash-2'
+        mock_run.return_value = MagicMock(returncode=0, stdout=b'ai\nkey\n')
+        self.assertEqual(drush.enabled_modules('php', self.root), frozenset({'ai', 'key'}))
+        drush.enabled_modules('php', self.root, use_cache=False)
+
+        self.assertEqual(mock_run.call_count, 3)
+        # Una huella por consulta: para validar la entrada o para guardar el resultado nuevo
+        self.assertEqual(self.mock_hash.call_count, 3)
+
+    def test_verify_ai_all_reports_each_site_in_order(self):
+        """Test that parallel verification prints each site's output as one block, in order."""
+        for name in ('b.com', 'a.com', 'empty.com'):
+            (self.root / 'sites' / name / 'web').mkdir(parents=True)
+        for name in ('a.com', 'b.com'):
+            (self.root / 'sites' / name / 'web' / 'index.php').touch()
+
+        def fake_verify(site_name, deep_check=False):
+            print(f"inicio {site_name}")
+            print(f"fin {site_name}")
+            return site_name == 'a.com'
+
+        with patch.object(self.manager, 'verify_ai', side_effect=fake_verify), \
+             patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertFalse(self.manager.verify_ai_all(pool=2))
+
+        output = stdout.getvalue()
+        self.assertIn("===== a.com =====\ninicio a.com\nfin a.com\n", output)
+        self.assertIn("===== b.com =====\ninicio b.com\nfin b.com\n", output)
+        self.assertLess(output.index("a.com ====="), output.index("b.com ====="))
+        self.assertNotIn("empty.com", output)
+
+    @patch('builtins.print')
+    def test_site_creation_retry_provisions_with_stored_password(self, mock_print):
+        """Test that a retry reuses only its own stored password and still provisions the user."""
+        with patch.object(site_state, 'SITE_STATE_DIR', self.root / 'state'):
+            site_state.save_site_state('my-site', {'db_name': site_state.site_db_name('my-site'),
+                                                   'db_password': 'stored'})
+            for name in ('my-site', 'my.site'):
+                self.manager._execute_site_creation(name, '8.3', site_state.site_db_name(name), self.root / name)
+
+        first, second = self.manager.mysql.provision_site.call_args_list
+        self.assertEqual(first.args, (site_state.site_db_name('my-site'), site_state.site_db_user('my-site'), 'stored'))
+        self.assertNotEqual(second.args[2], 'stored')
+
+    def test_thread_stdout_forwards_stream_attributes(self):
+        """Test that the per-thread stdout proxy exposes the wrapped stream's attributes."""
+        target = MagicMock(encoding='utf-8')
+        target.isatty.return_value = False
+        stdout = _ThreadStdout(target)
+
+        self.assertEqual(stdout.encoding, 'utf-8')
+        self.assertFalse(stdout.isatty())
+        with stdout.capture() as output:
+            stdout.write('capturado')
+        self.assertEqual(output.getvalue(), 'capturado')
+        target.write.assert_not_called()
+
+    def test_bulk_apply_collects_results_per_site(self):
+        """Test that bulk_apply forwards arguments, isolates failures and rejects unknown operations."""
+        def fake_switch(site_name, php_version):
+            if site_name == 'bad.com':
+                raise RuntimeError('vhost roto')
+            return php_version == '8.3'
+
+        with patch.object(self.manager, 'switch_php_version', side_effect=fake_switch), \
+             patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            results = self.manager.bulk_apply(['a.com', 'bad.com'], 'switch_php_version', php_version='8.3')
+
+        self.assertEqual(results, {'a.com': True, 'bad.com': False})
+        self.assertIn("===== bad.com =====\n❌ Error en 'bad.com': vhost roto\n", stdout.getvalue())
+        with self.assertRaises(ValueError):
+            self.manager.bulk_apply(['a.com'], 'create_drupal_site')
+
+    def test_verify_ai_overlaps_steps_and_keeps_output_order(self):
+        """Test that the Drush and connection checks run concurrently but print in order."""
+        (self.root / 'sites' / 'a.com').mkdir(parents=True)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def step(label, result=None):
+            def run(*args):
+                barrier.wait()
+                print(label)
+                return result
+            return run
+
+        with patch.object(self.manager, '_verify_drupal_modules', side_effect=step('modulos')), \
+             patch.object(self.manager, '_validate_env_file', side_effect=step('env', {'K': 'v'})), \
+             patch.object(self.manager, '_test_ai_connections', side_effect=lambda *args: print('conexiones')), \
+             patch.object(self.manager, '_verify_test_agent', side_effect=step('agente')), \
+             patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertTrue(self.manager.verify_ai('a.com'))
+
+        self.assertTrue(stdout.getvalue().endswith("modulos\nenv\nconexiones\nagente\n"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# tests/test_mysql_manager.py
+
+import unittest
+from unittest.mock import patch, MagicMock
+
+from unified_stack_manager.linux.mysql_manager import MySQLManager
+
+class TestMySQLManager(unittest.TestCase):
+
+    def setUp(self):
+        config = MagicMock()
+        config.get.side_effect = lambda key, default=None: default
+        with patch('unified_stack_manager.linux.mysql_manager.get_package_manager'):
+            self.manager = MySQLManager(config, MagicMock(), MagicMock())
+
+    def test_provision_site_runs_single_batch(self):
+        """Test that database, user and grants are sent in one execution."""
+        with patch.object(self.manager, '_execute_query', return_value=True) as mock_query:
+            self.assertTrue(self.manager.provision_site('test_com_db', 'test_com_db_user', "pa'ss"))
+
+        mock_query.assert_called_once()
+        statements = mock_query.call_args[0]
+        self.assertEqual(len(statements), 4)
+        self.assertIn("CREATE DATABASE IF NOT EXISTS `test_com_db`", statements[0])
+        self.assertIn("IDENTIFIED BY 'pa\\'ss'", statements[1])
+        self.assertEqual(statements[3], "FLUSH PRIVILEGES;")
+
+    def test_provision_site_rejects_invalid_identifier(self):
+        """Test that identifiers outside the allowlist never reach MySQL."""
+        with patch.object(self.manager, '_execute_query') as mock_query:
+            self.assertFalse(self.manager.provision_site('db`; DROP DATABASE x; --', 'user', 'pw'))
+        mock_query.assert_not_called()
+
+    def test_cached_connection_is_revived(self):
+        """Test that the persistent connection is pinged with reconnect before each use."""
+        conn = MagicMock()
+        self.manager._conn = conn
+        self.manager._use_cli = False
+
+        self.assertIs(self.manager._get_connection(), conn)
+        conn.ping.assert_called_once_with(reconnect=True)
+
+    @patch('unified_stack_manager.linux.mysql_manager.time.sleep')
+    def test_restart_waits_for_queued_job(self, mock_sleep):
+        """Test that a restart is reported only after its job finishes, not from the initial state."""
+        unit = MagicMock()
+        # (job, ActiveState) vistos en cada consulta: el job sigue en cola con la unidad aún activa
+        states = iter([((7, b'/job/7'), b'active'), ((7, b'/job/7'), b'activating'), ((0, b'/'), b'failed')])
+        type(unit.Unit).Job = property(lambda _: current[0])
+        type(unit.Unit).ActiveState = property(lambda _: current[1])
+
+        def advance(_):
+            current[:] = next(states)
+        current = list(next(states))
+        mock_sleep.side_effect = advance
+
+        self.assertFalse(self.manager._manage_unit(unit, 'restart'))
+        unit.Unit.Restart.assert_called_once_with(b'replace')
+        self.assertEqual(mock_sleep.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# tests/test_package_manager.py
+
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from unified_stack_manager.platform import package_manager
+from unified_stack_manager.platform.package_manager import AptPackageManager, PackageInstallPlanner
+
+DPKG_OUTPUT = "apache2 installed\nmysql-server installed\nphp8.2 config-files\n"
+
+class TestAptPackageManager(unittest.TestCase):
+
+    def setUp(self):
+        package_manager._dpkg_installed_set.cache_clear()
+
+    def tearDown(self):
+        package_manager._dpkg_installed_set.cache_clear()
+
+    @patch('subprocess.run')
+    def test_is_installed_uses_single_snapshot(self, mock_run):
+        """Test that several lookups only spawn dpkg-query once."""
+        mock_run.return_value = MagicMock(stdout=DPKG_OUTPUT)
+        apt = AptPackageManager()
+
+        self.assertTrue(apt.is_installed('apache2'))
+        self.assertTrue(apt.is_installed('mysql-server'))
+        self.assertFalse(apt.is_installed('php8.2'))
+        self.assertFalse(apt.is_installed('nginx'))
+        self.assertEqual(mock_run.call_count, 1)
+
+    @patch('subprocess.run')
+    def test_install_invalidates_snapshot(self, mock_run):
+        """Test that installing packages forces a fresh snapshot on the next lookup."""
+        mock_run.return_value = MagicMock(stdout=DPKG_OUTPUT)
+        apt = AptPackageManager()
+
+        self.assertFalse(apt.is_installed('nginx'))
+        mock_run.return_value = MagicMock(stdout=DPKG_OUTPUT + "nginx installed\n")
+        apt.install(['nginx'])
+
+        self.assertTrue(apt.is_installed('nginx'))
+
+    @patch('subprocess.run')
+    def test_installed_status_batches_lookups(self, mock_run):
+        """Test that installed_status reports several packages from one dpkg-query call."""
+        mock_run.return_value = MagicMock(stdout=DPKG_OUTPUT)
+        status = AptPackageManager().installed_status(['apache2', 'php8.2', 'nginx'])
+
+        self.assertEqual(status, {'apache2': True, 'php8.2': False, 'nginx': False})
+        self.assertEqual(mock_run.call_count, 1)
+
+    @patch('os.stat')
+    @patch('subprocess.run')
+    def test_update_cache_skipped_when_fresh(self, mock_run, mock_stat):
+        """Test that apt-get update is skipped when the apt lists are recent."""
+        mock_stat.return_value.st_mtime = time.time() - 60
+        with patch.object(AptPackageManager, '_last_update', None):
+            self.assertTrue(AptPackageManager().update_cache())
+        mock_run.assert_not_called()
+
+    @patch('os.stat')
+    @patch('subprocess.run')
+    def test_update_cache_forced(self, mock_run, mock_stat):
+        """Test that max_age=0 always runs apt-get update."""
+        mock_stat.return_value.st_mtime = time.time()
+        with patch.object(AptPackageManager, '_last_update', None):
+            self.assertTrue(AptPackageManager().update_cache(max_age=0))
+        mock_run.assert_called_once()
+
+    @patch('subprocess.run', side_effect=FileNotFoundError)
+    def test_is_installed_without_dpkg(self, mock_run):
+        """Test that a missing dpkg-query is treated as nothing installed."""
+        self.assertFalse(AptPackageManager().is_installed('apache2'))
+
+class TestPackageInstallPlanner(unittest.TestCase):
+
+    def test_execute_installs_all_packages_once(self):
+        """Test that packages from several components are installed in a single call."""
+        pkg_manager = MagicMock()
+        pkg_manager.install.return_value = True
+        post_install = MagicMock(return_value=True)
+
+        planner = PackageInstallPlanner(pkg_manager)
+        planner.add(['apache2', 'apache2-utils'])
+        planner.add(['mysql-server', 'apache2'], [post_install])
+
+        self.assertTrue(planner.execute())
+        pkg_manager.update_cache.assert_called_once()
+        pkg_manager.install.assert_called_once_with(['apache2', 'apache2-utils', 'mysql-server'])
+        post_install.assert_called_once()
+
+    def test_execute_skips_post_install_on_failure(self):
+        """Test that post-install actions do not run when the install fails."""
+        pkg_manager = MagicMock()
+        pkg_manager.install.return_value = False
+        post_install = MagicMock(return_value=True)
+
+        planner = PackageInstallPlanner(pkg_manager)
+        planner.add(['mysql-server'], [post_install])
+
+        self.assertFalse(planner.execute())
+        post_install.assert_not_called()
+
+    def test_execute_runs_every_post_install_action(self):
+        """Test that all post-install actions run and any failure is reported."""
+        pkg_manager = MagicMock()
+        pkg_manager.install.return_value = True
+        actions = [MagicMock(return_value=True), MagicMock(return_value=False), MagicMock(return_value=True)]
+
+        planner = PackageInstallPlanner(pkg_manager)
+        planner.add(['apache2'], actions)
+
+        self.assertFalse(planner.execute())
+        for action in actions:
+            action.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
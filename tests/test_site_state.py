@@ -0,0 +1,81 @@
+# tests/test_site_state.py
+
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from unified_stack_manager.core import site_state
+
+class TestSiteState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        state_patch = patch.object(site_state, 'SITE_STATE_DIR', Path(self.tmp.name) / 'sites')
+        state_patch.start()
+        self.addCleanup(state_patch.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_db_name_is_deterministic(self):
+        """Test that database names are derived from the site name only."""
+        self.assertEqual(site_state.site_db_name('example.com'), site_state.site_db_name('example.com'))
+        self.assertEqual(site_state.site_db_name('intranet'), 'intranet_db')
+        self.assertTrue(site_state.site_db_name('My-Site.example.com').startswith('my_site_example_com_'))
+        self.assertEqual(len(site_state.site_db_name('a' * 100)), 48 + len('_db'))
+
+    def test_similar_names_do_not_collide(self):
+        """Test that names that slug to the same text still get their own database, user and state."""
+        for first, second in (('my-site', 'my.site'), ('my-site.com', 'my.site-com'), ('a' * 60, 'a' * 61)):
+            self.assertNotEqual(site_state.site_db_name(first), site_state.site_db_name(second))
+            self.assertNotEqual(site_state.site_db_user(first), site_state.site_db_user(second))
+
+        site_state.save_site_state('my-site', {'db_password': 'secret'})
+        self.assertEqual(site_state.load_site_state('my.site'), {})
+
+    def test_db_user_fits_mysql_limit(self):
+        """Test that database users are deterministic and at most 32 characters long."""
+        self.assertEqual(site_state.site_db_user('intranet'), 'intranet_user')
+        long_user = site_state.site_db_user('a' * 100 + '.com')
+        self.assertEqual(len(long_user), site_state.MYSQL_USER_MAX_LEN)
+        self.assertEqual(long_user, site_state.site_db_user('a' * 100 + '.com'))
+        self.assertNotEqual(long_user, site_state.site_db_user('a' * 100 + '.org'))
+
+    def test_state_file_stays_in_state_dir(self):
+        """Test that a site name with path separators cannot write outside the state directory."""
+        site_state.save_site_state('..\\..\\x', {'db_name': 'x_db'})
+        site_state.save_site_state('../../y', {'db_name': 'y_db'})
+
+        names = sorted(p.name for p in site_state.SITE_STATE_DIR.iterdir())
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(name.startswith('______') and name.endswith('.json') for name in names))
+        self.assertEqual(site_state.load_site_state('../../y'), {'db_name': 'y_db', 'site_name': '../../y'})
+
+    def test_save_and_load_round_trip(self):
+        """Test that saved state is private to the user and read back with the site name."""
+        state = {'db_name': 'example_com_db', 'db_password': 'secret'}
+        site_state.save_site_state('example.com', state)
+
+        state_file, = site_state.SITE_STATE_DIR.iterdir()
+        self.assertEqual(stat.S_IMODE(state_file.stat().st_mode), 0o600)
+        self.assertEqual(site_state.load_site_state('example.com'), {**state, 'site_name': 'example.com'})
+
+    def test_delete_removes_stored_password(self):
+        """Test that deleting the state after a successful creation leaves nothing on disk."""
+        site_state.save_site_state('example.com', {'db_password': 'secret'})
+        site_state.delete_site_state('example.com')
+        site_state.delete_site_state('example.com')
+
+        self.assertEqual(list(site_state.SITE_STATE_DIR.iterdir()), [])
+
+    def test_load_missing_or_corrupt_state(self):
+        """Test that missing or unreadable state is treated as no previous attempt."""
+        self.assertEqual(site_state.load_site_state('missing.com'), {})
+        site_state.SITE_STATE_DIR.mkdir(parents=True)
+        (site_state.SITE_STATE_DIR / 'broken.com.json').write_text('{')
+        self.assertEqual(site_state.load_site_state('broken.com'), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,8 +16,9 @@ from unified_stack_manager.core.base_stack_manager import BaseStackManager
 @click.option('--dry-run', is_flag=True, help='Simula las acciones sin ejecutarlas')
 @click.option('--config', type=click.Path(exists=True, dir_okay=False, path_type=Path), help='Archivo de configuración custom')
 @click.option('--verbose', '-v', is_flag=True, help='Salida detallada')
+@click.option('--yes', '-y', 'assume_yes', is_flag=True, help='Responde "sí" a las confirmaciones (modo no interactivo)')
 @click.pass_context
-def cli(ctx, dry_run, config, verbose):
+def cli(ctx, dry_run, config, verbose, assume_yes):
     """UnifiedStackManager - Herramienta para gestionar stacks WAMP/LAMP."""
 
     # Banner
@@ -57,10 +58,10 @@ def cli(ctx, dry_run, config, verbose):
     manager: BaseStackManager
     if platform_info.os == PlatformEnum.WINDOWS:
         from unified_stack_manager.windows.stack_manager import WindowsStackManager
-        manager = WindowsStackManager(config=app_config, logger=logger, dry_run=dry_run)
+        manager = WindowsStackManager(config=app_config, logger=logger, dry_run=dry_run, assume_yes=assume_yes)
     elif platform_info.os == PlatformEnum.LINUX:
         from unified_stack_manager.linux.stack_manager import LinuxStackManager
-        manager = LinuxStackManager(config=app_config, logger=logger, dry_run=dry_run)
+        manager = LinuxStackManager(config=app_config, logger=logger, dry_run=dry_run, assume_yes=assume_yes)
     else:
         click.secho(f"❌ Plataforma no implementada: {platform_info.os.value}", fg='red')
         sys.exit(1)
@@ -124,12 +125,17 @@ def switch_php(ctx, site_name, php_version):
 
 @cli.command('verify-ai')
 @click.option('--site', help='Nombre del sitio a verificar')
+@click.option('--all', 'all_sites', is_flag=True, help='Verificar todos los sitios en paralelo')
+@click.option('--deep-check', is_flag=True, help='Consultar /api/tags de Ollama en lugar de un HEAD rápido')
 @click.pass_context
-def verify_ai(ctx, site):
+def verify_ai(ctx, site, all_sites, deep_check):
     """Verificar el entorno de IA y las conexiones a los proveedores."""
     manager = ctx.obj['manager']
     try:
-        manager.verify_ai(site_name=site)
+        if all_sites:
+            manager.verify_ai_all(deep_check=deep_check)
+        else:
+            manager.verify_ai(site_name=site, deep_check=deep_check)
     except Exception as e:
         handle_exception(e, ctx.obj['verbose'])
 
@@ -0,0 +1,198 @@
+# unified_stack_manager/core/ai_probes.py
+import asyncio
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# (nombre, url, cabeceras, timeout en segundos, método HTTP)
+Probe = Tuple[str, str, Optional[Dict[str, str]], float, str]
+# (nombre, ok, detalle del error)
+ProbeResult = Tuple[str, bool, str]
+
+# Un HEAD solo comprueba que el servicio está vivo: cualquier respuesta HTTP
+# de las esperadas vale (la raíz de Ollama puede responder 404 según la versión).
+_HEAD_UP_STATUSES = frozenset({200, 404})
+
+
+# Segundos durante los que se reutiliza el resultado de una sonda idéntica
+PROBE_CACHE_TTL = 30
+_recent_probes: Dict[Tuple, Tuple[float, Future]] = {}
+_recent_lock = threading.Lock()
+
+
+def _status_ok(method: str, status: int) -> bool:
+    return status in _HEAD_UP_STATUSES if method == "HEAD" else status == 200
+
+
+def _is_configured(value: Optional[str]) -> bool:
+    """Una clave cuenta como configurada si tiene valor y no es la de ejemplo."""
+    return bool(value) and "your_" not in value
+
+
+def provider_probes(env_vars: Dict[str, str], deep: bool = False) -> List[Probe]:
+    """
+    Construye las sondas de Ollama y de los proveedores con API key configurada.
+    Por defecto Ollama se comprueba con un HEAD ligero a la raíz; con deep=True
+    se consulta /api/tags, que además enumera los modelos instalados.
+    """
+    ollama_url = env_vars.get("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
+    if deep:
+        probes: List[Probe] = [("Ollama", f"{ollama_url}/api/tags", None, 5, "GET")]
+    else:
+        probes = [("Ollama", f"{ollama_url}/", None, 1.5, "HEAD")]
+
+    openai_key = env_vars.get("OPENAI_API_KEY")
+    if _is_configured(openai_key):
+        probes.append(("OpenAI API", "https://api.openai.com/v1/models",
+                       {"Authorization": f"Bearer {openai_key}"}, 10, "GET"))
+
+    anthropic_key = env_vars.get("ANTHROPIC_API_KEY")
+    if _is_configured(anthropic_key):
+        probes.append(("Anthropic API", "https://api.anthropic.com/v1/models",
+                       {"x-api-key": anthropic_key, "anthropic-version": "2023-06-01"}, 10, "GET"))
+
+    google_key = env_vars.get("GOOGLE_GEMINI_API_KEY")
+    if _is_configured(google_key):
+        # La key va en cabecera para que no aparezca en URLs ni en mensajes de error
+        probes.append(("Google Gemini API", "https://generativelanguage.googleapis.com/v1beta/models",
+                       {"x-goog-api-key": google_key}, 10, "GET"))
+
+    return probes
+
+
+async def _probe_async(session, name: str, url: str, headers: Optional[Dict[str, str]],
+                       timeout: float, method: str) -> ProbeResult:
+    """Lanza la petición sobre la sesión compartida de aiohttp."""
+    try:
+        async with session.request(method, url, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if _status_ok(method, response.status):
+                return name, True, ""
+            return name, False, f"HTTP {response.status}"
+    except Exception as e:
+        return name, False, str(e) or type(e).__name__
+
+
+async def _probe_all_async(probes: List[Probe]) -> List[ProbeResult]:
+    """Ejecuta todas las sondas a la vez reutilizando una única sesión HTTP."""
+    async with aiohttp.ClientSession() as session:
+        # Una cancelación o error inesperado en una sonda no debe descartar el resto
+        results = await asyncio.gather(*(_probe_async(session, *probe) for probe in probes),
+                                       return_exceptions=True)
+    return [
+        (probe[0], False, str(result) or type(result).__name__) if isinstance(result, BaseException) else result
+        for probe, result in zip(probes, results)
+    ]
+
+
+def _probe_urllib(probe: Probe) -> ProbeResult:
+    """Alternativa sin dependencias basada en urllib."""
+    name, url, headers, timeout, method = probe
+    request = urllib.request.Request(url, headers=headers or {}, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception as e:
+        return name, False, str(e)
+    if _status_ok(method, status):
+        return name, True, ""
+    return name, False, f"HTTP {status}"
+
+
+def _probe_key(probe: Probe) -> Tuple:
+    name, url, headers, timeout, method = probe
+    return name, url, tuple(sorted((headers or {}).items())), method
+
+
+def _run_async(coro):
+    """
+    Equivalente a asyncio.run que usa el bucle de uvloop si está instalado.
+    En Windows asyncio ya usa por defecto el bucle Proactor (IOCP).
+    No se instala ninguna política global de bucle de eventos.
+    """
+    if uvloop is None:
+        return asyncio.run(coro)
+    loop = uvloop.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def _run_uncached(probes: List[Probe]) -> List[ProbeResult]:
+    if aiohttp is not None:
+        return _run_async(_probe_all_async(probes))
+
+    with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+        return list(executor.map(_probe_urllib, probes))
+
+
+def _forget(entries):
+    """Quita de la caché las sondas fallidas, salvo que otro hilo ya las haya sustituido."""
+    with _recent_lock:
+        for key, entry in entries:
+            if _recent_probes.get(key) is entry:
+                del _recent_probes[key]
+
+
+def run_probes(probes: List[Probe]) -> List[ProbeResult]:
+    """
+    Comprueba varios endpoints HTTP en paralelo, de modo que el tiempo total es
+    el de la sonda más lenta y no la suma de todas. Usa aiohttp si está
+    instalado y, si no, un pool de hilos con urllib. Los resultados se
+    devuelven en el mismo orden que las sondas.
+
+    Una sonda idéntica (misma URL y cabeceras) que respondió bien en los
+    últimos PROBE_CACHE_TTL segundos, o todavía en curso en otro hilo, no se
+    repite: en verify-ai --all todos los sitios comparten la misma resolución
+    DNS, conexión TLS y respuesta de cada proveedor. Los fallos no se guardan,
+    para que un reintento vuelva a comprobar el servicio.
+    """
+    if not probes:
+        return []
+
+    now = time.monotonic()
+    own: List[Tuple[Tuple, Probe, Tuple[float, Future]]] = []
+    futures: List[Future] = []
+    with _recent_lock:
+        # Descartar las entradas caducadas para que la caché no crezca sin límite
+        for key in [k for k, (created, _) in _recent_probes.items() if now - created > PROBE_CACHE_TTL]:
+            del _recent_probes[key]
+        for probe in probes:
+            key = _probe_key(probe)
+            entry = _recent_probes.get(key)
+            if entry is None:
+                entry = (now, Future())
+                _recent_probes[key] = entry
+                own.append((key, probe, entry))
+            futures.append(entry[1])
+
+    if own:
+        try:
+            results = _run_uncached([probe for _, probe, _ in own])
+        except BaseException as e:
+            _forget((key, entry) for key, _, entry in own)
+            for _, _, (_, future) in own:
+                future.set_exception(e)
+            raise
+        _forget((key, entry) for (key, _, entry), (_, ok, _) in zip(own, results) if not ok)
+        for (_, _, (_, future)), result in zip(own, results):
+            future.set_result(result)
+
+    return [future.result() for future in futures]
@@ -1,24 +1,79 @@
 # unified_stack_manager/core/base_stack_manager.py
 
+import io
+import os
+import sys
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Optional
 from pathlib import Path
 
 from unified_stack_manager.core.config import UnifiedConfig
 from unified_stack_manager.core.logger import AuditLogger
 from unified_stack_manager.core.rollback import RollbackManager
 
+class _ThreadStdout:
+    """
+    Sustituto de sys.stdout que envía lo que escribe cada hilo a su propio
+    buffer mientras está en capture(), para que las verificaciones en paralelo
+    no mezclen su salida. El resto de escrituras van al stdout original.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._local = threading.local()
+
+    def write(self, data: str) -> int:
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self.target).write(data)
+
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self.target.flush()
+
+    def __getattr__(self, name):
+        # encoding, isatty(), fileno()... los consultan click, logging o subprocess
+        return getattr(self.target, name)
+
+    @contextmanager
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+@contextmanager
+def _thread_stdout():
+    """Instala _ThreadStdout como sys.stdout mientras dure el bloque (si no lo está ya)."""
+    if isinstance(sys.stdout, _ThreadStdout):
+        yield sys.stdout
+        return
+    stdout = _ThreadStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        yield stdout
+    finally:
+        sys.stdout = stdout.target
+
 class BaseStackManager(ABC):
     """
     Clase base abstracta para WindowsStackManager y LinuxStackManager.
     Define la interfaz común que ambos deben implementar.
     """
 
-    def __init__(self, config: UnifiedConfig, logger: AuditLogger, dry_run: bool = False):
+    # Operaciones que solo afectan a un sitio y que bulk_apply puede ejecutar en
+    # paralelo. Cada plataforma excluye las que cambian configuración global.
+    BULK_OPERATIONS = ('verify_ai', 'enable_markdown', 'switch_php_version', 'test_ai_agents')
+
+    def __init__(self, config: UnifiedConfig, logger: AuditLogger, dry_run: bool = False, assume_yes: bool = False):
         self.config = config
         self.logger = logger
         self.rollback = RollbackManager()
         self.dry_run = dry_run
+        self.assume_yes = assume_yes
 
     @abstractmethod
     def install_components(self, components: List[str]) -> bool:
@@ -26,7 +81,7 @@ class BaseStackManager(ABC):
         pass
 
     @abstractmethod
-    def verify_ai(self, site_name: Optional[str] = None) -> bool:
+    def verify_ai(self, site_name: Optional[str] = None, deep_check: bool = False) -> bool:
         """Verifica el entorno de IA y conexiones"""
         pass
 
@@ -55,6 +110,84 @@ class BaseStackManager(ABC):
         """Retorna el path del sitio"""
         pass
 
+    @abstractmethod
+    def get_sites_root(self) -> Path:
+        """Retorna el directorio que contiene los sitios"""
+        pass
+
+    def verify_ai_all(self, pool: Optional[int] = None, deep_check: bool = False) -> bool:
+        """
+        Verifica en paralelo todos los sitios Drupal del directorio de sitios.
+        La salida de cada sitio se acumula y se imprime completa, en orden.
+        """
+        sites = self._drupal_site_names()
+        if not sites:
+            print(f"⚠️ No se encontraron sitios Drupal en {self.get_sites_root()}")
+            return True
+
+        workers = max(1, min(pool or self.config.get('verify.concurrency', 4), len(sites)))
+        print(f"🔍 Verificando {len(sites)} sitios con {workers} en paralelo...")
+        results = self.bulk_apply(sites, 'verify_ai', max_workers=workers, deep_check=deep_check)
+        return all(results.values())
+
+    def bulk_apply(self, sites: List[str], op_name: str, max_workers: int = 5, **kwargs) -> Dict[str, bool]:
+        """
+        Aplica una operación de un solo sitio (ver BULK_OPERATIONS) a varios
+        sitios en paralelo, de cinco en cinco por defecto. La salida de cada sitio
+        se imprime completa y en el orden de la lista. Devuelve el resultado de la
+        operación por sitio.
+        """
+        if op_name not in self.BULK_OPERATIONS:
+            raise ValueError(f"Operación no soportada en lote en esta plataforma: '{op_name}'")
+        operation = getattr(self, op_name)
+
+        with _thread_stdout() as stdout:
+            def apply(site_name: str):
+                with stdout.capture() as output:
+                    try:
+                        ok = bool(operation(site_name, **kwargs))
+                    except Exception as e:
+                        print(f"❌ Error en '{site_name}': {e}")
+                        ok = False
+                return ok, output.getvalue()
+
+            results = {}
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sites)))) as executor:
+                for site_name, (ok, output) in zip(sites, executor.map(apply, sites)):
+                    stdout.write(f"\n===== {site_name} =====\n{output}")
+                    results[site_name] = ok
+        return results
+
+    def _drupal_site_names(self) -> List[str]:
+        """Nombres de los sitios del directorio de sitios que tienen web/index.php."""
+        try:
+            with os.scandir(self.get_sites_root()) as entries:
+                return sorted(
+                    entry.name for entry in entries
+                    if entry.is_dir() and os.path.exists(os.path.join(entry.path, 'web', 'index.php'))
+                )
+        except OSError:
+            return []
+
+    def _run_in_parallel(self, steps: List[Callable[[], None]]):
+        """
+        Ejecuta a la vez pasos independientes que esperan sobre todo a procesos
+        externos o a la red (Drush, sondas HTTP) e imprime la salida de todos,
+        en el orden de la lista, con una única escritura en stdout.
+        """
+        with _thread_stdout() as stdout:
+            def run(step: Callable[[], None]) -> str:
+                with stdout.capture() as output:
+                    try:
+                        step()
+                    except Exception as e:
+                        print(f"❌ Error inesperado: {e}")
+                return output.getvalue()
+
+            with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+                stdout.write(''.join(executor.map(run, steps)))
+            stdout.flush()
+
     @abstractmethod
     def enable_markdown(self, site_name: str) -> bool:
         """Habilita el soporte de Markdown para un sitio existente"""
@@ -65,9 +198,14 @@ class BaseStackManager(ABC):
         """Ejecuta pruebas de agentes de IA y genera un reporte"""
         pass
 
+    def _confirm(self, prompt: str) -> bool:
+        """Pide confirmación interactiva, salvo en modo no interactivo (--yes)"""
+        if self.assume_yes:
+            return True
+        return input(prompt).lower() == 'y'
+
     def _log_operation(self, action: str, target: str, details: Dict = None):
         """Helper para logging consistente"""
-        import os
         self.logger.audit(
             action=action,
             target=target,
@@ -0,0 +1,400 @@
+# unified_stack_manager/core/drush.py
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson es opcional: más rápido que json y acepta directamente los bytes de Drush
+json_loads = orjson.loads if orjson is not None else json.loads
+
+# Módulos Drupal que el modo IA habilita y que verify-ai comprueba (en orden de presentación)
+REQUIRED_MODULES: Tuple[str, ...] = (
+    "ai", "key", "ai_agents", "ai_simple_pdf_to_text", "tool",
+    "ai_automators", "ai_assistants_api", "ai_chatbot", "ai_ckeditor",
+    "ai_content_suggestions", "ai_translate", "ai_search", "ai_logging",
+    "ai_observability", "ai_image_alt_text", "ai_media_image", "ai_seo",
+    "mcp", "model_context_protocol", "langfuse", "ai_provider_openai",
+    "ai_provider_ollama", "ai_provider_anthropic", "ai_provider_google",
+    "ckeditor5_markdown", "ai_agents_test",
+)
+REQUIRED_MODULE_SET = frozenset(REQUIRED_MODULES)
+
+# Scripts PHP de la verificación del agente de prueba (ai_agents_test)
+TEST_AGENT_CREATE_SCRIPT = """
+$agent = \\Drupal::entityTypeManager()->getStorage('ai_agent')->load('test_agent_verify');
+if (!$agent) {
+    $agent = \\Drupal::entityTypeManager()->getStorage('ai_agent')->create([
+        'id' => 'test_agent_verify',
+        'label' => 'Agente de Prueba para Verificación',
+        'actions' => [
+            [
+                'action' => 'create_node',
+                'node_type' => 'article',
+                'title' => 'Prueba de Agente - ' . date('Y-m-d H:i:s'),
+                'body' => 'Contenido generado automáticamente para validar el agente.',
+            ],
+        ],
+    ]);
+    $agent->save();
+    echo "Agente 'test_agent_verify' creado.\\n";
+}
+"""
+
+# Ejecuta el agente desde el propio bootstrap si el módulo expone el servicio;
+# si no, responde UNAVAILABLE y se recurre a `drush ai-agents:execute`.
+TEST_AGENT_EXECUTE_SCRIPT = """
+$container = \\Drupal::getContainer();
+if (!$container->has('plugin.manager.ai_agents')
+    || !method_exists($manager = $container->get('plugin.manager.ai_agents'), 'execute')) {
+    echo "UNAVAILABLE";
+    return;
+}
+$manager->execute('test_agent_verify');
+echo "EXECUTED";
+"""
+
+TEST_AGENT_VALIDATE_SCRIPT = """
+$query = \\Drupal::entityQuery('node')
+    ->condition('type', 'article')
+    ->condition('title', 'Prueba de Agente - ', 'CONTAINS')
+    ->sort('created', 'DESC')
+    ->range(0, 1)
+    ->accessCheck(FALSE);
+$nids = $query->execute();
+if (!empty($nids)) {
+    $nid = reset($nids);
+    $node = \\Drupal\\node\\Entity\\Node::load($nid);
+    echo "SUCCESS:" . $node->id() . ":" . $node->getTitle();
+} else {
+    echo "FAILURE";
+}
+"""
+
+# Caché en disco del resultado de `drush pm:list` por sitio. Se invalida cuando
+# cambia la configuración core.extension (también con `drush en`/`pm:uninstall`
+# fuera de USM), composer.lock o settings.php, al caducar el TTL o cuando USM
+# activa módulos.
+PM_LIST_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'usm'
+PM_LIST_CACHE_TTL = 60
+
+# Hash de la configuración core.extension leída directamente de la BD del sitio
+# con PDO, sin arrancar Drupal ni Drush (unas decenas de ms frente a ~1 s de pm:list).
+CORE_EXTENSION_HASH_SCRIPT = r"""
+$app_root = getcwd();
+$site_path = 'sites/default';
+$settings = [];
+$databases = [];
+require $site_path . '/settings.php';
+$db = $databases['default']['default'];
+$prefix = $db['prefix'] ?? '';
+if (is_array($prefix)) {
+    $prefix = $prefix['default'] ?? '';
+}
+if ($db['driver'] === 'sqlite') {
+    $dsn = 'sqlite:' . $db['database'];
+} else {
+    $dsn = $db['driver'] . ':host=' . ($db['host'] ?? 'localhost')
+        . (empty($db['port']) ? '' : ';port=' . $db['port']) . ';dbname=' . $db['database'];
+}
+$pdo = new PDO($dsn, $db['username'] ?? null, $db['password'] ?? null, [PDO::ATTR_TIMEOUT => 5]);
+$stmt = $pdo->prepare("SELECT data FROM {$prefix}config WHERE collection = '' AND name = 'core.extension'");
+$stmt->execute();
+echo md5((string) $stmt->fetchColumn());
+"""
+
+# Copia en memoria de los últimos resultados, delante de la caché en disco, para
+# las consultas repetidas en un mismo proceso (verify-ai --all, bulk_apply).
+_MODULES_MEMO_SIZE = 5
+_modules_memo: 'OrderedDict[Path, Tuple[float, list, frozenset]]' = OrderedDict()
+_modules_memo_lock = threading.Lock()
+
+
+class DrushError(RuntimeError):
+    """Drush terminó con un código de salida distinto de cero."""
+
+
+def _pm_list_cache_file(site_path: Path) -> Path:
+    """Fichero de caché de los módulos habilitados de un sitio."""
+    key = hashlib.blake2b(str(site_path).encode(), digest_size=8).hexdigest()
+    return PM_LIST_CACHE_DIR / f"drush_pm_list_{key}.json"
+
+
+def _core_extension_hash(php_cmd: str, site_path: Path) -> str:
+    """
+    Hash de core.extension, que cambia cada vez que se habilita o desinstala un
+    módulo. Cadena vacía si no se puede leer (la caché queda limitada al TTL).
+    """
+    try:
+        result = subprocess.run([php_cmd, "-r", CORE_EXTENSION_HASH_SCRIPT],
+                                cwd=site_path / "web", capture_output=True, timeout=15)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return result.stdout.decode(errors='replace').strip() if result.returncode == 0 else ""
+
+
+def _pm_list_fingerprint(php_cmd: str, site_path: Path) -> list:
+    """Hash de core.extension y mtimes de los ficheros que cambian al instalar o reinstalar módulos."""
+    fingerprint = [_core_extension_hash(php_cmd, site_path)]
+    for path in (site_path / "composer.lock", site_path / "web" / "sites" / "default" / "settings.php"):
+        try:
+            fingerprint.append(path.stat().st_mtime)
+        except OSError:
+            fingerprint.append(0.0)
+    return fingerprint
+
+
+def invalidate_enabled_modules(site_path: Path):
+    """Descarta la caché de pm:list de un sitio tras activar o desactivar módulos."""
+    with _modules_memo_lock:
+        _modules_memo.pop(site_path, None)
+    _pm_list_cache_file(site_path).unlink(missing_ok=True)
+
+
+def _remember_modules(site_path: Path, created: float, fingerprint: list, modules: frozenset):
+    with _modules_memo_lock:
+        _modules_memo[site_path] = (created, fingerprint, modules)
+        _modules_memo.move_to_end(site_path)
+        if len(_modules_memo) > _MODULES_MEMO_SIZE:
+            _modules_memo.popitem(last=False)
+
+
+def module_report(enabled: frozenset) -> str:
+    """
+    Resume los módulos requeridos: una línea con el recuento de habilitados y
+    una línea por cada módulo que falta, en el orden de REQUIRED_MODULES.
+    """
+    missing = REQUIRED_MODULE_SET - enabled
+    total = len(REQUIRED_MODULES)
+    if not missing:
+        return f"  ✅ Los {total} módulos requeridos están habilitados."
+    lines = [f"  ⚠️ Habilitados {total - len(missing)} de {total} módulos requeridos; faltan {len(missing)}:"]
+    lines += [f"  ❌ Módulo '{mod}'" for mod in REQUIRED_MODULES if mod in missing]
+    return "\n".join(lines)
+
+
+def agent_test_report(site_name: str, format: str, success: bool, output: str, errors: str) -> str:
+    """
+    Compone el informe de ai-agents:test (JSON o Markdown) como un único texto
+    terminado en salto de línea, para escribirlo de una sola vez.
+    """
+    # Una sola lectura del reloj para todas las marcas de tiempo del informe
+    now = time.localtime()
+    if format == 'json':
+        report = {
+            "site": site_name,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", now),
+            "success": success,
+            "output": output,
+            "error": errors
+        }
+        return json.dumps(report, indent=2) + "\n"
+
+    # Markdown por defecto
+    lines = [
+        f"# Informe de Pruebas de Agentes de IA - {site_name}",
+        f"**Fecha:** {time.strftime('%Y-%m-%d', now)}",
+        f"**Hora:** {time.strftime('%H:%M:%S', now)}",
+        "\n## Resultados",
+        "✅ Todas las pruebas se ejecutaron correctamente." if success else "❌ Se detectaron errores en las pruebas.",
+        "\n### Salida del comando:",
+        "```",
+        output,
+    ]
+    if errors:
+        lines += ["\n### Errores:", errors]
+    lines.append("```")
+    return "\n".join(lines) + "\n"
+
+
+def enabled_modules(php_cmd: str, site_path: Path, use_cache: bool = True) -> frozenset:
+    """
+    Devuelve los módulos habilitados de un sitio según `drush pm:list`,
+    reutilizando el último resultado si el sitio no ha cambiado desde entonces.
+    Con use_cache=False siempre consulta a Drush (y refresca la caché).
+    Lanza DrushError si Drush falla.
+    """
+    now = time.time()
+    cache_file = _pm_list_cache_file(site_path)
+    fingerprint = None
+    if use_cache:
+        with _modules_memo_lock:
+            entry = _modules_memo.get(site_path)
+        from_disk = entry is None or now - entry[0] >= PM_LIST_CACHE_TTL
+        if from_disk:
+            try:
+                cached = json_loads(cache_file.read_bytes())
+                entry = (cached["created"], cached["fingerprint"], frozenset(cached["modules"]))
+            except (OSError, ValueError, KeyError, TypeError):
+                entry = None
+
+        # La huella lanza un proceso php: solo se calcula si hay una entrada vigente que validar
+        if entry is not None and now - entry[0] < PM_LIST_CACHE_TTL:
+            fingerprint = _pm_list_fingerprint(php_cmd, site_path)
+            if entry[1] == fingerprint:
+                if from_disk:
+                    _remember_modules(site_path, *entry)
+                return entry[2]
+
+    if fingerprint is None:
+        # Tomada antes de pm:list: si los módulos cambian entre medias, la entrada
+        # guardada no coincidirá con la siguiente huella y se volverá a consultar
+        fingerprint = _pm_list_fingerprint(php_cmd, site_path)
+
+    # Solo los nombres, uno por línea: en sitios grandes el JSON completo de pm:list
+    # (paquete, ruta, versión...) ocupa cientos de KB y solo se necesitan las claves.
+    drush_path = site_path / "vendor" / "bin" / "drush"
+    command = [php_cmd, str(drush_path), "pm:list", "--type=module", "--status=enabled", "--field=name"]
+    result = subprocess.run(command, cwd=site_path / "web", capture_output=True)
+    if result.returncode != 0:
+        raise DrushError(f"Error al ejecutar Drush: {result.stderr.decode(errors='replace')}")
+
+    modules = frozenset(result.stdout.decode().split())
+    created = time.time()
+    _remember_modules(site_path, created, fingerprint, modules)
+    try:
+        PM_LIST_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps({
+            "fingerprint": fingerprint, "created": created, "modules": sorted(modules)
+        }))
+    except OSError:
+        pass
+    return modules
+
+
+def run_test_agent(php_cmd: str, site_path: Path) -> str:
+    """
+    Crea, ejecuta y valida el agente de prueba con un único bootstrap de Drupal
+    y devuelve la salida de la validación. Solo lanza un segundo proceso de
+    Drush si el módulo no permite ejecutar el agente desde PHP. Lanza DrushError.
+    """
+    with DrushWorker(php_cmd, site_path) as worker:
+        worker.run(TEST_AGENT_CREATE_SCRIPT)
+
+        ok, output = worker.run(TEST_AGENT_EXECUTE_SCRIPT)
+        if not ok:
+            raise DrushError(f"Falló la ejecución del agente. Error: {output}")
+        if output.strip() != "EXECUTED":
+            drush_path = site_path / "vendor" / "bin" / "drush"
+            result = subprocess.run(
+                [php_cmd, str(drush_path), "ai-agents:execute", "test_agent_verify"],
+                cwd=site_path / "web", capture_output=True
+            )
+            if result.returncode != 0:
+                raise DrushError(f"Falló la ejecución del agente. Error: {result.stderr.decode(errors='replace')}")
+
+        return worker.run(TEST_AGENT_VALIDATE_SCRIPT)[1]
+
+
+# Bucle del worker: lee fragmentos PHP (uno por línea, en JSON) y responde con una
+# línea JSON por fragmento, todo dentro de un único bootstrap de Drupal.
+_WORKER_SCRIPT = r"""<?php
+while (($line = fgets(STDIN)) !== false) {
+    $code = json_decode($line, true);
+    ob_start();
+    try {
+        eval($code);
+        $ok = true;
+    } catch (\Throwable $e) {
+        echo $e->getMessage();
+        $ok = false;
+    }
+    $output = ob_get_clean();
+    fwrite(STDOUT, json_encode(['ok' => $ok, 'output' => $output]) . "\n");
+    fflush(STDOUT);
+}
+"""
+
+
+class DrushWorker:
+    """
+    Proceso `drush php:script` persistente que ejecuta varios fragmentos PHP con
+    un solo bootstrap de Drupal. Se reinicia tras max_calls fragmentos para no
+    arrastrar estado (cachés estáticas, memoria) indefinidamente.
+    """
+
+    def __init__(self, php_cmd: str, site_path: Path, max_calls: int = 50):
+        self.php_cmd = php_cmd
+        self.site_path = site_path
+        self.max_calls = max_calls
+        self._process: Optional[subprocess.Popen] = None
+        self._script_file: Optional[Path] = None
+        self._stderr = None
+        self._calls = 0
+
+    def __enter__(self) -> 'DrushWorker':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _start(self):
+        fd, script = tempfile.mkstemp(prefix='usm_drush_worker_', suffix='.php')
+        with os.fdopen(fd, 'w') as f:
+            f.write(_WORKER_SCRIPT)
+        self._script_file = Path(script)
+        self._stderr = tempfile.TemporaryFile()
+
+        drush_path = self.site_path / "vendor" / "bin" / "drush"
+        self._process = subprocess.Popen(
+            [self.php_cmd, str(drush_path), "php:script", script],
+            cwd=self.site_path / "web", stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=self._stderr, text=True, encoding='utf-8', bufsize=1
+        )
+        self._calls = 0
+
+    def run(self, code: str) -> Tuple[bool, str]:
+        """Ejecuta un fragmento PHP en el worker; devuelve (ok, salida)."""
+        if self._process is None or self._process.poll() is not None or self._calls >= self.max_calls:
+            self.close()
+            self._start()
+
+        self._calls += 1
+        try:
+            self._process.stdin.write(json.dumps(code) + "\n")
+            self._process.stdin.flush()
+            line = self._process.stdout.readline()
+        except OSError:
+            line = ""
+        if not line:
+            self._stderr.seek(0)
+            error = self._stderr.read().decode(errors='replace').strip()
+            self.close()
+            raise DrushError(f"El worker de Drush terminó inesperadamente: {error}")
+
+        try:
+            response = json_loads(line)
+            return response["ok"], response["output"]
+        except (ValueError, KeyError, TypeError):
+            # Un aviso de PHP o un mensaje del bootstrap en stdout rompe el protocolo:
+            # el worker ya no está sincronizado con las respuestas
+            self.close()
+            raise DrushError(f"Respuesta inesperada del worker de Drush: {line.strip()}")
+
+    def close(self):
+        """Cierra el worker (EOF en stdin) y limpia sus ficheros temporales."""
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+                self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+        if self._stderr is not None:
+            self._stderr.close()
+            self._stderr = None
+        if self._script_file is not None:
+            self._script_file.unlink(missing_ok=True)
+            self._script_file = None
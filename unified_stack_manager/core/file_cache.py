@@ -0,0 +1,40 @@
+# unified_stack_manager/core/file_cache.py
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Generic, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class StatCache(Generic[T]):
+    """
+    Caché acotada del resultado de procesar un fichero. Cada entrada se identifica
+    por (ruta, mtime_ns, tamaño), así que cualquier modificación del fichero la
+    invalida sin tener que volver a leerlo. Segura para usar desde varios hilos.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[Tuple[str, int, int], T]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, loader: Callable[[Path], T]) -> T:
+        """Devuelve el resultado cacheado para path o lo calcula con loader(path)."""
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = loader(path)
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -3,6 +3,7 @@
 import logging
 import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 
@@ -36,6 +37,13 @@ class AuditLogger:
             logger.addHandler(handler)
         except PermissionError:
             print(f"Warning: Could not attach file handler for technical.log due to permissions.")
+
+        # Los mensajes informativos de los gestores también se muestran en consola
+        if not any(type(h) is logging.StreamHandler for h in logger.handlers):
+            console = logging.StreamHandler(sys.stdout)
+            console.setLevel(logging.INFO)
+            console.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(console)
         return logger
 
     def _setup_audit_logger(self):
@@ -50,6 +58,20 @@ class AuditLogger:
 
         return logger
 
+    # Mensajes técnicos con formateo diferido (estilo %s de logging): los
+    # argumentos sólo se formatean si el nivel está habilitado.
+    def debug(self, msg: str, *args):
+        self.tech_logger.debug(msg, *args)
+
+    def info(self, msg: str, *args):
+        self.tech_logger.info(msg, *args)
+
+    def warning(self, msg: str, *args):
+        self.tech_logger.warning(msg, *args)
+
+    def error(self, msg: str, *args):
+        self.tech_logger.error(msg, *args)
+
     def audit(self, action: str, target: str, user: str, details: dict = None):
         """Registra acción auditable en formato JSON"""
         entry = {
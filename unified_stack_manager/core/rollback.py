@@ -2,6 +2,7 @@
 
 import shutil
 import os
+import time
 from pathlib import Path
 from datetime import datetime
 from contextlib import contextmanager
@@ -70,7 +71,6 @@ class RollbackManager:
 
     def _cleanup_old_backups(self, days: int):
         """Elimina backups más antiguos de X días"""
-        import time
         cutoff = time.time() - (days * 86400)
 
         try:
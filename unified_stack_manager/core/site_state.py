@@ -0,0 +1,90 @@
+# unified_stack_manager/core/site_state.py
+import hashlib
+import json
+import os
+import re
+import secrets
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+# Estado local por sitio (credenciales de la BD) para que repetir una creación
+# fallida reutilice la base de datos ya creada en lugar de dejarla huérfana.
+SITE_STATE_DIR = Path.home() / '.usm' / 'sites'
+
+_DB_NAME_RE = re.compile(r'[^a-z0-9_]')
+
+# Longitud máxima de un nombre de usuario en MySQL
+MYSQL_USER_MAX_LEN = 32
+
+
+def _site_key(site_name: str, max_len: int) -> str:
+    """
+    Nombre del sitio reducido a [a-z0-9_] y a max_len caracteres, apto para la BD
+    y para ficheros. Si eso altera el nombre se añade un hash corto del original,
+    para que 'my-site' y 'my.site' no compartan base de datos ni estado.
+    """
+    slug = _DB_NAME_RE.sub('_', site_name.lower())
+    if slug == site_name and len(slug) <= max_len:
+        return slug
+    digest = hashlib.blake2b(site_name.encode(), digest_size=4).hexdigest()
+    return f"{slug[:max_len - len(digest) - 1]}_{digest}"
+
+
+def site_db_name(site_name: str) -> str:
+    """Nombre de BD determinista a partir del nombre del sitio."""
+    return f"{_site_key(site_name, 48)}_db"
+
+
+def site_db_user(site_name: str) -> str:
+    """Usuario de BD determinista que cabe en el límite de MySQL."""
+    return f"{_site_key(site_name, MYSQL_USER_MAX_LEN - len('_user'))}_user"
+
+
+def generate_db_password() -> str:
+    """
+    Contraseña de 16 caracteres URL-safe (96 bits) obtenida con una sola lectura
+    del RNG del sistema. Sus caracteres [A-Za-z0-9_-] no necesitan escaparse en
+    la URL de conexión de Drush.
+    """
+    return secrets.token_urlsafe(12)
+
+
+def _state_file(site_name: str) -> Path:
+    # Saneado: el nombre no puede salir de SITE_STATE_DIR (p. ej. '..\x' en Windows)
+    return SITE_STATE_DIR / f"{_site_key(site_name, 64)}.json"
+
+
+def load_site_state(site_name: str) -> Dict[str, str]:
+    """
+    Devuelve el estado guardado del sitio, o un diccionario vacío si no hay o si
+    pertenece a otro sitio.
+    """
+    try:
+        state = json.loads(_state_file(site_name).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) and state.get('site_name') == site_name else {}
+
+
+def save_site_state(site_name: str, state: Dict[str, str]):
+    """
+    Guarda el estado del sitio de forma atómica (fichero temporal + os.replace)
+    y legible solo por el usuario actual, ya que contiene la contraseña de la BD.
+    """
+    SITE_STATE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    state_file = _state_file(site_name)
+    fd, tmp = tempfile.mkstemp(prefix=f".{state_file.stem}.", suffix='.tmp', dir=SITE_STATE_DIR)
+    try:
+        # mkstemp crea el fichero con permisos 0o600
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({**state, 'site_name': site_name}, f)
+        os.replace(tmp, state_file)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def delete_site_state(site_name: str):
+    """Borra el estado del sitio (y con él la contraseña) una vez creado el sitio."""
+    _state_file(site_name).unlink(missing_ok=True)
@@ -2,8 +2,8 @@
 
 import subprocess
 from pathlib import Path
-from typing import Dict
-from unified_stack_manager.platform.package_manager import get_package_manager
+from typing import Callable, Dict, List, Optional, Tuple
+from unified_stack_manager.platform.package_manager import get_package_manager, PackageInstallPlanner
 
 class ApacheManager:
     def __init__(self, config, logger, rollback):
@@ -14,20 +14,27 @@ class ApacheManager:
 
     def install(self) -> bool:
         """Instala Apache HTTP Server"""
+        plan = self.plan_install()
+        if plan is None:
+            return False
+        planner = PackageInstallPlanner(self.pkg_manager)
+        planner.add(*plan)
+        return planner.execute()
+
+    def plan_install(self) -> Optional[Tuple[List[str], List[Callable[[], bool]]]]:
+        """Retorna los paquetes de Apache a instalar y sus acciones post-instalación."""
 
         if self.pkg_manager.is_installed('apache2'):
             print("Apache ya está instalado.")
-            return True
+            return [], []
 
-        print("Instalando Apache...")
+        print("Añadiendo Apache al plan de instalación...")
         packages = self.config.get('apache.install_packages', [
             'apache2',
             'apache2-utils',
             'libapache2-mod-fcgid'
         ])
-
-        self.pkg_manager.update_cache()
-        return self.pkg_manager.install(packages)
+        return packages, []
 
     def create_virtualhost(self, site_name: str, doc_root: str, php_version: str) -> bool:
         """Crea un archivo de VirtualHost para un sitio."""
@@ -1,66 +1,247 @@
 # unified_stack_manager/linux/mysql_manager.py
 
-from typing import Dict
-from unified_stack_manager.platform.package_manager import get_package_manager
+from typing import Callable, List, Optional, Tuple, TypedDict
+from unified_stack_manager.platform.package_manager import get_package_manager, PackageInstallPlanner
+import re
+import shutil
 import subprocess
+import time
+
+try:
+    import pymysql
+except ImportError:
+    pymysql = None
+
+try:
+    from pystemd.systemd1 import Unit as SystemdUnit
+except ImportError:
+    SystemdUnit = None
+
+# Con rutas absolutas y close_fds=False, subprocess usa posix_spawn (vfork+exec)
+# en lugar de fork(). Es seguro porque los descriptores de Python no son heredables
+# por defecto (PEP 446).
+_SPAWN_KWARGS = {'close_fds': False}
+
+# Identificadores (BD, usuario, host, charset) que se interpolan en las sentencias DDL
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z0-9_.%-]+$')
+
+# Equivalente no interactivo de mysql_secure_installation, enviado en un solo lote
+_SECURE_SQL = (
+    "DROP USER IF EXISTS ''@'localhost';",
+    "DROP USER IF EXISTS ''@'%';",
+    "DROP DATABASE IF EXISTS test;",
+    "DELETE FROM mysql.db WHERE Db='test' OR Db='test\\_%';",
+    "FLUSH PRIVILEGES;",
+)
+
+# Estados de una unidad systemd mientras un job la está cambiando
+_TRANSITIONAL_STATES = frozenset({b'activating', b'deactivating', b'reloading'})
+
+class _ServiceStatusBase(TypedDict):
+    is_active: bool
+    status: str
+
+class ServiceStatus(_ServiceStatusBase, total=False):
+    """Estado de un servicio systemd; 'error' sólo aparece si no se pudo consultar."""
+    error: str
+
+def _escape_string(value: str) -> str:
+    """Escapa un literal de cadena SQL (contraseñas) para incluirlo entre comillas simples."""
+    if pymysql is not None:
+        return pymysql.converters.escape_string(value)
+    return value.replace('\\', '\\\\').replace("'", "\\'")
 
 class MySQLManager:
+    # Métodos de org.freedesktop.systemd1.Unit para cada acción y estado esperado
+    _UNIT_JOBS = {
+        'start': ('Start', b'active'),
+        'stop': ('Stop', b'inactive'),
+        'restart': ('Restart', b'active'),
+    }
+
     def __init__(self, config, logger, rollback):
         self.pkg_manager = get_package_manager()
         self.config = config
         self.logger = logger
         self.rollback = rollback
+        # Conexión persistente (PyMySQL) reutilizada por todas las consultas.
+        # Si no está disponible se recurre al cliente 'mysql' por consulta.
+        self._conn = None
+        self._use_cli = pymysql is None
+        # Rutas absolutas resueltas una sola vez en lugar de buscar en PATH en cada llamada
+        self._systemctl = shutil.which('systemctl')
+        self._mysql_client = shutil.which('mysql')
+        # Unidad systemd accedida por D-Bus (pystemd), reutilizada entre llamadas.
+        # Sin pystemd se recurre a systemctl.
+        self._unit = None
+        self._use_systemctl = SystemdUnit is None
 
     def install(self) -> bool:
         """Instala MySQL Server (o MariaDB, el default del sistema)"""
+        plan = self.plan_install()
+        if plan is None:
+            return False
+        planner = PackageInstallPlanner(self.pkg_manager)
+        planner.add(*plan)
+        return planner.execute()
+
+    def plan_install(self) -> Optional[Tuple[List[str], List[Callable[[], bool]]]]:
+        """Retorna los paquetes de MySQL a instalar y sus acciones post-instalación."""
 
         if self.pkg_manager.is_installed('mysql-server'):
-            print("MySQL ya está instalado.")
-            return True
+            self.logger.info("MySQL ya está instalado.")
+            return [], []
 
-        print("Instalando MySQL/MariaDB...")
+        self.logger.info("Añadiendo MySQL/MariaDB al plan de instalación...")
 
         # mysql-server es un paquete virtual en Debian/Ubuntu que instala
         # el default (usualmente mariadb-server)
         packages = ['mysql-server']
+        return packages, [self._post_install]
 
-        self.pkg_manager.update_cache()
-        if not self.pkg_manager.install(packages):
-            return False
-
+    def _post_install(self) -> bool:
+        """Acciones a ejecutar una vez instalados los paquetes."""
         # Asegurarse que el servicio está corriendo para operaciones post-install
         self.manage_service('start')
 
-        # Aquí se podría ejecutar mysql_secure_installation de forma no interactiva
-        # pero es complejo y depende de la versión. Por ahora, se omite.
+        if not self.secure_install(self.config.get('mysql.root_password')):
+            self.logger.warning("Aviso: No se pudo aplicar el endurecimiento inicial de MySQL.")
 
         return True
 
+    def secure_install(self, root_password: Optional[str] = None) -> bool:
+        """Aplica el endurecimiento de mysql_secure_installation en una sola ejecución."""
+        self.logger.info("Aplicando configuración segura de MySQL...")
+        statements = _SECURE_SQL
+        if root_password:
+            statements = (
+                f"ALTER USER 'root'@'localhost' IDENTIFIED BY '{_escape_string(root_password)}';",
+            ) + statements
+        return self._execute_query(*statements)
+
     def manage_service(self, action: str) -> bool:
         """Gestiona el servicio de MySQL (start, stop, restart, status)"""
         if action not in ['start', 'stop', 'restart', 'status']:
-            print(f"Acción '{action}' no válida.")
+            self.logger.error("Acción '%s' no válida.", action)
+            return False
+        unit = self._get_unit()
+        if unit is not None:
+            return self._manage_unit(unit, action)
+
+        if self._systemctl is None:
+            self.logger.error("Error: El comando 'systemctl' no fue encontrado.")
             return False
         try:
             # systemctl es el estándar en sistemas modernos (Ubuntu >= 16.04)
-            subprocess.run(['systemctl', action, 'mysql'], check=True, capture_output=True)
-            print(f"Servicio MySQL {action}ed correctamente.")
+            subprocess.run(
+                [self._systemctl, action, 'mysql'],
+                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, **_SPAWN_KWARGS
+            )
+            self.logger.info("Servicio MySQL %sed correctamente.", action)
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Error al ejecutar '{action}' en el servicio MySQL: {e.stderr.decode()}")
+            self.logger.error("Error al ejecutar '%s' en el servicio MySQL: %s", action, e.stderr)
             return False
-        except FileNotFoundError:
-            print("Error: El comando 'systemctl' no fue encontrado.")
+
+    def _get_unit(self):
+        """Retorna la unidad systemd de MySQL vía D-Bus, cargándola la primera vez."""
+        if self._unit is None and not self._use_systemctl:
+            try:
+                unit = SystemdUnit(b'mysql.service')
+                unit.load()
+                self._unit = unit
+            except Exception as e:
+                self.logger.warning("Aviso: No se pudo acceder a systemd por D-Bus (%s). Se usará systemctl.", e)
+                self._use_systemctl = True
+        return self._unit
+
+    def _manage_unit(self, unit, action: str) -> bool:
+        """Ejecuta la acción sobre la unidad por D-Bus y espera a que termine el job."""
+        try:
+            if action == 'status':
+                state = unit.Unit.ActiveState
+                expected = b'active'
+            else:
+                method, expected = self._UNIT_JOBS[action]
+                getattr(unit.Unit, method)(b'replace')
+                state = self._wait_for_job(unit)
+        except Exception as e:
+            self.logger.error("Error al ejecutar '%s' en el servicio MySQL: %s", action, e)
             return False
 
-    def _execute_query(self, query: str) -> bool:
-        """Ejecuta una consulta SQL como root."""
+        if state != expected:
+            self.logger.error("Error al ejecutar '%s' en el servicio MySQL: estado '%s'.", action, state.decode())
+            return False
+        self.logger.info("Servicio MySQL %sed correctamente.", action)
+        return True
+
+    def _wait_for_job(self, unit, timeout: float = 60.0) -> bytes:
+        """
+        Espera (como systemctl) a que termine el job encolado y devuelve el estado
+        final de la unidad. Mirar solo ActiveState no basta: justo después de encolar
+        un restart la unidad sigue 'active', y un start sobre una unidad caída
+        todavía la muestra 'failed'.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job_id = unit.Unit.Job[0]
+            state = unit.Unit.ActiveState
+            if (job_id == 0 and state not in _TRANSITIONAL_STATES) or time.monotonic() >= deadline:
+                return state
+            time.sleep(0.2)
+
+    def _get_connection(self):
+        """Retorna la conexión persistente como root, abriéndola la primera vez."""
+        if self._conn is not None:
+            try:
+                # La conexión cacheada muere si MySQL se reinicia: reconectar antes de usarla
+                self._conn.ping(reconnect=True)
+            except pymysql.MySQLError:
+                self._conn = None
+        if self._conn is None and not self._use_cli:
+            try:
+                self._conn = pymysql.connect(
+                    unix_socket=self.config.get('mysql.socket', '/var/run/mysqld/mysqld.sock'),
+                    user='root',
+                    password=self.config.get('mysql.root_password') or '',
+                    client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS,
+                )
+            except pymysql.MySQLError as e:
+                self.logger.warning("Aviso: No se pudo conectar a MySQL por socket (%s). Se usará el cliente 'mysql'.", e)
+                self._use_cli = True
+        return self._conn
+
+    def _execute_query(self, *queries: str) -> bool:
+        """Ejecuta una o varias consultas SQL como root en un solo viaje."""
+        conn = self._get_connection()
+        if conn is not None:
+            try:
+                with conn.cursor() as cursor:
+                    # Todas las sentencias viajan en un único paquete (MULTI_STATEMENTS)
+                    cursor.execute(' '.join(queries))
+                    while cursor.nextset():
+                        pass
+                conn.commit()
+                return True
+            except pymysql.MySQLError as e:
+                self.logger.error("Error al ejecutar la consulta SQL: %s", e)
+                return False
+
+        if self._mysql_client is None:
+            # El cliente puede haberse instalado después de crear el gestor
+            self._mysql_client = shutil.which('mysql')
+            if self._mysql_client is None:
+                self.logger.error("Error: El comando 'mysql' no fue encontrado.")
+                return False
         try:
             # Usar -e para pasar el comando directamente
-            subprocess.run(['mysql', '-e', query], check=True, capture_output=True)
+            subprocess.run(
+                [self._mysql_client, '-e', ' '.join(queries)],
+                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, **_SPAWN_KWARGS
+            )
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Error al ejecutar la consulta SQL: {e.stderr.decode()}")
+            self.logger.error("Error al ejecutar la consulta SQL: %s", e.stderr)
             return False
 
     def create_database(self, db_name: str) -> bool:
@@ -72,22 +253,45 @@ class MySQLManager:
 
     def create_user(self, username: str, password: str, host: str = 'localhost') -> bool:
         """Crea un nuevo usuario de base de datos."""
-        query = f"CREATE USER IF NOT EXISTS '{username}'@'{host}' IDENTIFIED BY '{password}';"
+        query = f"CREATE USER IF NOT EXISTS '{username}'@'{host}' IDENTIFIED BY '{_escape_string(password)}';"
         return self._execute_query(query)
 
     def grant_privileges(self, db_name: str, username: str, host: str = 'localhost') -> bool:
         """Otorga todos los privilegios a un usuario sobre una base de datos."""
         query = f"GRANT ALL PRIVILEGES ON `{db_name}`.* TO '{username}'@'{host}';"
-        if not self._execute_query(query):
-            return False
-        # Aplicar los cambios
-        return self._execute_query("FLUSH PRIVILEGES;")
+        # Aplicar los cambios en la misma ejecución
+        return self._execute_query(query, "FLUSH PRIVILEGES;")
+
+    def provision_site(self, db_name: str, username: str, password: str, host: str = 'localhost') -> bool:
+        """Crea la base de datos, el usuario y sus privilegios en una sola ejecución."""
+        charset = self.config.get('mysql.default_charset', 'utf8mb4')
+        collation = self.config.get('mysql.default_collation', 'utf8mb4_unicode_ci')
+        for identifier in (db_name, username, host, charset, collation):
+            if not _IDENTIFIER_RE.match(identifier):
+                self.logger.error("Error: Identificador MySQL no válido: '%s'.", identifier)
+                return False
+
+        return self._execute_query(
+            f"CREATE DATABASE IF NOT EXISTS `{db_name}` CHARACTER SET {charset} COLLATE {collation};",
+            f"CREATE USER IF NOT EXISTS '{username}'@'{host}' IDENTIFIED BY '{_escape_string(password)}';",
+            f"GRANT ALL PRIVILEGES ON `{db_name}`.* TO '{username}'@'{host}';",
+            "FLUSH PRIVILEGES;",
+        )
 
-    def get_status(self) -> Dict[str, any]:
+    def get_status(self) -> ServiceStatus:
         """Obtiene el estado del servicio MySQL."""
-        try:
-            result = subprocess.run(['systemctl', 'is-active', 'mysql'], capture_output=True, text=True)
-            is_active = result.stdout.strip() == 'active'
-            return {'is_active': is_active, 'status': result.stdout.strip()}
-        except FileNotFoundError:
+        unit = self._get_unit()
+        if unit is not None:
+            try:
+                state = unit.Unit.ActiveState.decode()
+                return {'is_active': state == 'active', 'status': state}
+            except Exception:
+                pass
+
+        if self._systemctl is None:
             return {'is_active': False, 'status': 'unknown', 'error': 'systemctl not found'}
+        result = subprocess.run(
+            [self._systemctl, 'is-active', 'mysql'], capture_output=True, text=True, **_SPAWN_KWARGS
+        )
+        is_active = result.stdout.strip() == 'active'
+        return {'is_active': is_active, 'status': result.stdout.strip()}
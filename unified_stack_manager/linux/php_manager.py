@@ -1,8 +1,20 @@
 # unified_stack_manager/linux/php_manager.py
 
-from unified_stack_manager.platform.package_manager import get_package_manager
+from typing import Callable, List, Optional, Tuple
+from unified_stack_manager.platform.package_manager import get_package_manager, PackageInstallPlanner
+from functools import lru_cache
+import os
+import shutil
 import subprocess
 
+# Módulos comunes para aplicaciones web (ej. Drupal, WordPress)
+_DEFAULT_PHP_MODULES = ('', '-cli', '-fpm', '-mysql', '-gd', '-xml', '-curl', '-mbstring', '-zip', '-intl')
+
+@lru_cache(maxsize=None)
+def _default_php_packages(version: str) -> Tuple[str, ...]:
+    """Paquetes por defecto de una versión de PHP, generados una sola vez por versión."""
+    return tuple(f'php{version}{suffix}' for suffix in _DEFAULT_PHP_MODULES)
+
 class PHPManager:
     def __init__(self, config, logger, rollback):
         self.pkg_manager = get_package_manager()
@@ -10,76 +22,101 @@ class PHPManager:
         self.logger = logger
         self.rollback = rollback
         self.ppa = self.config.get('php.ppa_repository', 'ppa:ondrej/php')
+        # Ruta absoluta resuelta una sola vez en lugar de buscar en PATH en cada llamada
+        self._add_apt_repository = shutil.which('add-apt-repository')
+
+    def _ppa_configured(self, sources_dir: str = '/etc/apt/sources.list.d') -> bool:
+        """Comprueba si alguna fuente de apt activa ya referencia el PPA de ondrej/php."""
+        try:
+            entries = os.scandir(sources_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith(('.list', '.sources')) or not entry.is_file():
+                    continue
+                try:
+                    with open(entry.path, 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                if b'ondrej' not in data:
+                    continue
+                # Ignorar entradas comentadas (PPA deshabilitado)
+                for line in data.splitlines():
+                    if not line.lstrip().startswith(b'#') and b'ondrej' in line and b'php' in line:
+                        return True
+        return False
 
     def _add_ppa(self) -> bool:
         """Añade el PPA de ondrej/php si no está presente."""
-        try:
-            # Comprobar si el PPA ya está añadido
-            result = subprocess.run(
-                ['grep', '-rh', '^deb', '/etc/apt/sources.list.d/'],
-                capture_output=True, text=True, check=True
-            )
-            if 'ondrej' in result.stdout and 'php' in result.stdout:
-                print("El PPA de ondrej/php ya está configurado.")
-                return True
-        except (FileNotFoundError, subprocess.CalledProcessError):
-            # El directorio puede no existir o grep puede no encontrar nada
-            pass
+        if self._ppa_configured():
+            self.logger.info("El PPA de ondrej/php ya está configurado.")
+            return True
 
-        print(f"Añadiendo el PPA: {self.ppa}")
+        self.logger.info("Añadiendo el PPA: %s", self.ppa)
 
         # Instalar software-properties-common si es necesario
         if not self.pkg_manager.is_installed('software-properties-common'):
-            print("Instalando 'software-properties-common'...")
+            self.logger.info("Instalando 'software-properties-common'...")
             if not self.pkg_manager.install(['software-properties-common']):
-                print("Error: No se pudo instalar 'software-properties-common'.")
+                self.logger.error("Error: No se pudo instalar 'software-properties-common'.")
+                return False
+
+        if self._add_apt_repository is None:
+            # software-properties-common puede haberse instalado justo ahora
+            self._add_apt_repository = shutil.which('add-apt-repository')
+            if self._add_apt_repository is None:
+                self.logger.error("Error: El comando 'add-apt-repository' no fue encontrado.")
                 return False
 
         try:
+            # -n evita el apt-get update interno; se hace una sola vez a continuación
             subprocess.run(
-                ['add-apt-repository', '-y', self.ppa],
+                [self._add_apt_repository, '-y', '-n', self.ppa],
                 check=True,
-                capture_output=True
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                # Permite a subprocess usar posix_spawn en vez de fork() (ver mysql_manager)
+                close_fds=False
             )
-            print("PPA añadido correctamente. Actualizando caché de paquetes...")
-            return self.pkg_manager.update_cache()
+            self.logger.info("PPA añadido correctamente. Actualizando caché de paquetes...")
+            # El nuevo repositorio obliga a refrescar la caché aunque sea reciente
+            return self.pkg_manager.update_cache(max_age=0)
         except subprocess.CalledProcessError as e:
-            print(f"Error al añadir el PPA: {e.stderr.decode()}")
-            return False
-        except FileNotFoundError:
-            print("Error: El comando 'add-apt-repository' no fue encontrado.")
+            self.logger.error("Error al añadir el PPA: %s", e.stderr)
             return False
 
     def install(self, version: str) -> bool:
         """Instala una versión específica de PHP y módulos comunes."""
+        plan = self.plan_install(version)
+        if plan is None:
+            return False
+        planner = PackageInstallPlanner(self.pkg_manager)
+        planner.add(*plan)
+        return planner.execute()
+
+    def plan_install(self, version: str) -> Optional[Tuple[List[str], List[Callable[[], bool]]]]:
+        """Retorna los paquetes de PHP a instalar y sus acciones post-instalación."""
 
         supported_versions = self.config.get('php.supported_versions', [])
         if version not in supported_versions:
-            print(f"Error: La versión de PHP '{version}' no está soportada en la configuración.")
-            return False
+            self.logger.error("Error: La versión de PHP '%s' no está soportada en la configuración.", version)
+            return None
 
+        # El PPA debe estar configurado antes de resolver los paquetes
         if not self._add_ppa():
-            return False
+            return None
 
         package_name = f'php{version}'
         if self.pkg_manager.is_installed(package_name):
-            print(f"PHP {version} ya está instalado.")
-            return True
+            self.logger.info("PHP %s ya está instalado.", version)
+            return [], []
+
+        self.logger.info("Añadiendo PHP %s y módulos comunes al plan de instalación...", version)
 
-        print(f"Instalando PHP {version} y módulos comunes...")
-
-        # Lista de módulos comunes para aplicaciones web (ej. Drupal, WordPress)
-        packages = self.config.get(f'php.modules_{version}', [
-            f'php{version}',
-            f'php{version}-cli',
-            f'php{version}-fpm',
-            f'php{version}-mysql',
-            f'php{version}-gd',
-            f'php{version}-xml',
-            f'php{version}-curl',
-            f'php{version}-mbstring',
-            f'php{version}-zip',
-            f'php{version}-intl'
-        ])
-
-        return self.pkg_manager.install(packages)
+        packages = self.config.get(f'php.modules_{version}') or list(_default_php_packages(version))
+        # Sólo se pasan a apt los paquetes que realmente faltan
+        status = self.pkg_manager.installed_status(packages)
+        return [package for package in packages if not status[package]], []
@@ -1,8 +1,52 @@
 # unified_stack_manager/platform/package_manager.py
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional
+import os
 import subprocess
 import platform
+import threading
+import time
+
+# Serializa las operaciones que toman el lock del gestor de paquetes del sistema
+# (apt/dpkg y yum no admiten transacciones concurrentes).
+_package_lock = threading.Lock()
+
+# Límite de acciones post-instalación simultáneas, para no agotar la memoria
+# de máquinas pequeñas al arrancar varios servicios a la vez.
+_MAX_PARALLEL_ACTIONS = min(3, os.cpu_count() or 1)
+
+
+@lru_cache(maxsize=None)
+def _dpkg_installed_set() -> frozenset:
+    """Snapshot (cacheado por proceso) de los paquetes instalados según dpkg."""
+    try:
+        result = subprocess.run(
+            ['dpkg-query', '-W', '-f=${Package} ${db:Status-Status}\n'],
+            capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return frozenset()
+    return frozenset(
+        name for name, _, status in (line.partition(' ') for line in result.stdout.splitlines())
+        if status == 'installed'
+    )
+
+
+@lru_cache(maxsize=None)
+def _rpm_installed_set() -> frozenset:
+    """Snapshot (cacheado por proceso) de los paquetes instalados según rpm."""
+    try:
+        result = subprocess.run(
+            ['rpm', '-qa', '--qf', '%{NAME}\n'],
+            capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return frozenset()
+    return frozenset(result.stdout.split())
+
 
 class PackageManager(ABC):
     """Abstracción para gestores de paquetes"""
@@ -15,71 +59,138 @@ class PackageManager(ABC):
     def is_installed(self, package: str) -> bool:
         pass
 
+    def installed_status(self, packages: list[str]) -> dict[str, bool]:
+        """Estado de instalación de varios paquetes con una sola consulta al sistema."""
+        return {package: self.is_installed(package) for package in packages}
+
     @abstractmethod
-    def update_cache(self) -> bool:
+    def update_cache(self, max_age: int = 3600) -> bool:
+        """Actualiza la caché de paquetes salvo que tenga menos de max_age segundos (0 fuerza)."""
         pass
 
 
 class AptPackageManager(PackageManager):
     """Para Debian/Ubuntu"""
 
+    # Compartido entre instancias: cada gestor de componente crea la suya
+    _last_update: Optional[float] = None
+
     def install(self, packages: list[str]) -> bool:
         try:
-            subprocess.run(
-                ['apt-get', 'install', '-y'] + packages,
-                check=True,
-                capture_output=True
-            )
+            with _package_lock:
+                subprocess.run(
+                    ['apt-get', 'install', '-y'] + packages,
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Error instalando paquetes: {e.stderr.decode()}")
+            print(f"Error instalando paquetes: {e.stderr}")
             return False
+        finally:
+            _dpkg_installed_set.cache_clear()
 
     def is_installed(self, package: str) -> bool:
-        result = subprocess.run(
-            ['dpkg', '-l', package],
-            capture_output=True
-        )
-        return result.returncode == 0
+        return package in _dpkg_installed_set()
 
-    def update_cache(self) -> bool:
+    def update_cache(self, max_age: int = 3600) -> bool:
+        if max_age > 0 and self._cache_is_fresh(max_age):
+            return True
+        _dpkg_installed_set.cache_clear()
         try:
-            subprocess.run(['apt-get', 'update'], check=True)
+            with _package_lock:
+                subprocess.run(['apt-get', 'update'], check=True)
+            AptPackageManager._last_update = time.monotonic()
             return True
         except subprocess.CalledProcessError:
             return False
 
+    def _cache_is_fresh(self, max_age: int) -> bool:
+        """Comprueba si ya se actualizó en este proceso o si las listas de apt son recientes."""
+        if self._last_update is not None and time.monotonic() - self._last_update < max_age:
+            return True
+        try:
+            return time.time() - os.stat('/var/lib/apt/lists').st_mtime < max_age
+        except OSError:
+            return False
+
 
 class YumPackageManager(PackageManager):
     """Para RedHat/CentOS/Rocky"""
 
+    _last_update: Optional[float] = None
+
     def install(self, packages: list[str]) -> bool:
         try:
-            subprocess.run(
-                ['yum', 'install', '-y'] + packages,
-                check=True,
-                capture_output=True
-            )
+            with _package_lock:
+                subprocess.run(
+                    ['yum', 'install', '-y'] + packages,
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Error instalando paquetes: {e.stderr.decode()}")
+            print(f"Error instalando paquetes: {e.stderr}")
             return False
+        finally:
+            _rpm_installed_set.cache_clear()
 
     def is_installed(self, package: str) -> bool:
-        result = subprocess.run(
-            ['rpm', '-q', package],
-            capture_output=True
-        )
-        return result.returncode == 0
+        return package in _rpm_installed_set()
 
-    def update_cache(self) -> bool:
+    def update_cache(self, max_age: int = 3600) -> bool:
+        if max_age > 0 and self._last_update is not None and time.monotonic() - self._last_update < max_age:
+            return True
+        _rpm_installed_set.cache_clear()
         try:
-            subprocess.run(['yum', 'check-update'], check=False)
+            with _package_lock:
+                subprocess.run(['yum', 'check-update'], check=False)
+            YumPackageManager._last_update = time.monotonic()
             return True
         except subprocess.CalledProcessError:
             return False
 
 
+class PackageInstallPlanner:
+    """
+    Agrupa los paquetes de varios componentes para instalarlos con una sola
+    invocación del gestor de paquetes (una resolución de dependencias y una
+    sola ejecución de triggers), seguida de las acciones post-instalación.
+    """
+
+    def __init__(self, pkg_manager: PackageManager):
+        self.pkg_manager = pkg_manager
+        self.packages: list[str] = []
+        self.post_install: list[Callable[[], bool]] = []
+
+    def add(self, packages: list[str], post_install: list[Callable[[], bool]] = None):
+        """Añade los paquetes (sin duplicados) y acciones de un componente al plan."""
+        for package in packages:
+            if package not in self.packages:
+                self.packages.append(package)
+        self.post_install.extend(post_install or [])
+
+    def execute(self) -> bool:
+        """Actualiza la caché e instala todo el plan de una vez; luego ejecuta las acciones."""
+        if self.packages:
+            self.pkg_manager.update_cache()
+            if not self.pkg_manager.install(self.packages):
+                return False
+
+        # Las acciones post-instalación de cada componente (arrancar servicios,
+        # asegurar MySQL...) son independientes entre sí y se ejecutan en paralelo.
+        if len(self.post_install) <= 1:
+            return all(action() for action in self.post_install)
+
+        with ThreadPoolExecutor(max_workers=_MAX_PARALLEL_ACTIONS) as executor:
+            results = list(executor.map(lambda action: action(), self.post_install))
+        return all(results)
+
+
 def get_package_manager() -> PackageManager:
     """Factory: detecta y retorna el package manager apropiado"""
 